@@ -13,6 +13,7 @@ print("Database connected. Setting up tables...")
 cursor.execute('DROP TABLE IF EXISTS traders')
 cursor.execute('DROP TABLE IF EXISTS transactions')
 cursor.execute('DROP TABLE IF EXISTS daily_rates')
+cursor.execute('DROP TABLE IF EXISTS changes')
 print("Existing tables dropped.")
 
 # Create the 'traders' table
@@ -21,7 +22,8 @@ CREATE TABLE traders (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     name TEXT NOT NULL,
     line TEXT NOT NULL,
-    total_debt REAL NOT NULL DEFAULT 0.0
+    total_debt REAL NOT NULL DEFAULT 0.0,
+    version INTEGER NOT NULL DEFAULT 1 -- Bumped when the name or line changes, checked when editing
 )
 ''')
 print("Table 'traders' created successfully.")
@@ -37,6 +39,7 @@ CREATE TABLE transactions (
     driver_name TEXT, -- This is the new column
     total_amount REAL,
     amount_paid REAL,
+    version INTEGER NOT NULL DEFAULT 1, -- Bumped on every change, checked when editing
     FOREIGN KEY (trader_id) REFERENCES traders (id)
 )
 ''')
@@ -54,6 +57,16 @@ CREATE TABLE daily_rates (
 ''')
 print("Table 'daily_rates' created successfully.")
 
+# Create the 'changes' table, the feed that keeps other open windows up to date
+cursor.execute('''
+CREATE TABLE changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL, -- e.g. 'transaction', 'trader', 'rates'
+    payload TEXT NOT NULL -- JSON describing what changed
+)
+''')
+print("Table 'changes' created successfully.")
+
 # --- INITIAL DATA (for testing) ---
 traders_data = [
     ('Rajesh Kumar', 'Pati', 5400.00),
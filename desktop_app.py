@@ -1,6 +1,9 @@
 import sqlite3
 import webview  # <-- ADD THIS IMPORT
-from flask import Flask, render_template, request, redirect, url_for, g, flash
+import time
+import json
+from contextlib import contextmanager
+from flask import Flask, render_template, request, redirect, url_for, g, flash, Response
 from datetime import date, timedelta
 from threading import Thread # <-- ADD THIS IMPORT
 
@@ -11,13 +14,32 @@ app = Flask(__name__)
 app.secret_key = 'your_super_secret_key_change_this_later'
 
 DATABASE = 'poultry.db'
+# Several counters and the desktop app share poultry.db, so a writer may have to
+# wait its turn. SQLite itself waits up to BUSY_TIMEOUT seconds for a lock; if the
+# lock is still held, a write transaction is retried WRITE_RETRIES times with a
+# back-off that doubles from WRITE_RETRY_DELAY seconds.
+BUSY_TIMEOUT = 10
+WRITE_RETRIES = 5
+WRITE_RETRY_DELAY = 0.1
+# Every write also appends a compact delta to the 'changes' table, which open pages
+# follow through /changes. Only the newest CHANGE_FEED_RETENTION deltas are kept;
+# the feed checks for new ones every CHANGE_POLL_INTERVAL seconds.
+CHANGE_FEED_RETENTION = 1000
+CHANGE_POLL_INTERVAL = 1
+CHANGE_KEEPALIVE_INTERVAL = 15
+
+_schema_checked = False
+
+class DatabaseBusyError(Exception):
+    """Raised when the write lock could not be obtained after all retries."""
 
 def get_db():
     """Opens a new database connection if there is none yet for the current application context."""
     if 'db' not in g:
-        g.db = sqlite3.connect(DATABASE)
+        g.db = sqlite3.connect(DATABASE, timeout=BUSY_TIMEOUT)
         # This is key! It makes database rows accessible like dictionaries.
         g.db.row_factory = sqlite3.Row
+        ensure_schema(g.db)
     return g.db
 
 @app.teardown_appcontext
@@ -26,6 +48,78 @@ def close_db(error):
     if hasattr(g, 'db'):
         g.db.close()
 
+@contextmanager
+def write_transaction(db):
+    """Runs the enclosed reads and writes as a single BEGIN IMMEDIATE transaction.
+
+    The write lock is taken before anything is read, so a balance read inside the
+    block cannot be changed by another counter before our update lands. The
+    transaction is committed when the block exits and rolled back on any error.
+    """
+    for attempt in range(WRITE_RETRIES):
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            break
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) and 'busy' not in str(e):
+                raise
+            if attempt == WRITE_RETRIES - 1:
+                raise DatabaseBusyError() from e
+            time.sleep(WRITE_RETRY_DELAY * 2 ** attempt)
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+def ensure_schema(db):
+    """Brings databases created by an older database_setup.py up to date."""
+    global _schema_checked
+    if _schema_checked:
+        return
+    with write_transaction(db):
+        for table in ('traders', 'transactions'):
+            columns = [column['name'] for column in db.execute(f'PRAGMA table_info({table})')]
+            if 'version' not in columns:
+                db.execute(f'ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+        db.execute('CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT NOT NULL)')
+    _schema_checked = True
+
+@app.errorhandler(DatabaseBusyError)
+def database_busy(error):
+    """Sends the user back to where they were instead of showing a server error."""
+    flash("The database is busy with another counter. Please try again.", 'error')
+    return redirect(request.referrer or url_for('home'))
+
+# --- CHANGE FEED ---
+def record_change(db, kind, **payload):
+    """Appends a delta to the change feed.
+
+    Call this inside write_transaction() so the delta is committed together with
+    the change it describes and sequence numbers follow commit order.
+    """
+    cursor = db.execute('INSERT INTO changes (kind, payload) VALUES (?, ?)', (kind, json.dumps(payload)))
+    db.execute('DELETE FROM changes WHERE seq <= ?', (cursor.lastrowid - CHANGE_FEED_RETENTION,))
+
+def record_ledger_change(db, trader_id, transaction_id, deleted=False):
+    """Records a trader's new balance along with the bill or payment that changed it."""
+    trader = db.execute('SELECT line, total_debt FROM traders WHERE id = ?', (trader_id,)).fetchone()
+    if deleted:
+        record_change(db, 'transaction_deleted', trader_id=trader_id, line=trader['line'], total_debt=trader['total_debt'], transaction_id=transaction_id)
+    else:
+        transaction = db.execute('SELECT * FROM transactions WHERE id = ?', (transaction_id,)).fetchone()
+        record_change(db, 'transaction', trader_id=trader_id, line=trader['line'], total_debt=trader['total_debt'], transaction=dict(transaction))
+
+def record_trader_change(db, trader_id):
+    """Records a trader's current name, line and balance."""
+    trader = db.execute('SELECT id, name, line, total_debt FROM traders WHERE id = ?', (trader_id,)).fetchone()
+    record_change(db, 'trader', trader=dict(trader))
+
+def latest_change_seq(db):
+    """Returns the sequence number of the newest change, so a page can follow the feed from there."""
+    return db.execute('SELECT COALESCE(MAX(seq), 0) FROM changes').fetchone()[0]
+
 # --- STATIC DATA ---
 lines = ["Pati", "Amjhera+Gandhwani", "Anjad", "Dahi", "Local"]
 bird_types = ["Minar", "Broiler", "Parent"]
@@ -36,19 +130,23 @@ drivers = ["Deepu", "Firoj", "Ritesh", "Akram", "Kanha", "Rahul", "Other"]
 @app.route('/')
 def home():
     """Renders the homepage."""
-    return render_template('home.html', lines=lines)
+    return render_template('home.html', lines=lines, drivers=drivers)
 
 @app.route('/line/<line_name>')
 def view_line(line_name):
     """Displays all traders for a specific line."""
     db = get_db()
+    # Read the feed position before the data, so a change saved in between is replayed rather than lost
+    change_seq = latest_change_seq(db)
     traders_in_line = db.execute('SELECT * FROM traders WHERE line = ? ORDER BY name', (line_name,)).fetchall()
-    return render_template('line_traders.html', line_name=line_name, traders_in_line=traders_in_line)
+    return render_template('line_traders.html', line_name=line_name, traders_in_line=traders_in_line, change_seq=change_seq)
 
 @app.route('/trader/<int:trader_id>')
 def view_trader(trader_id):
     """Displays the ledger for an individual trader."""
     db = get_db()
+    # Read the feed position before the data, so a change saved in between is replayed rather than lost
+    change_seq = latest_change_seq(db)
     selected_trader = db.execute('SELECT * FROM traders WHERE id = ?', (trader_id,)).fetchone()
     if not selected_trader:
         flash(f"Trader with ID {trader_id} not found.", 'error')
@@ -59,7 +157,7 @@ def view_trader(trader_id):
     current_rates = {r['bird_type']: r['rate'] for r in rates_from_db}
     
     trader_transactions = db.execute('SELECT * FROM transactions WHERE trader_id = ? ORDER BY date DESC, id DESC', (trader_id,)).fetchall()
-    return render_template('trader_ledger.html', trader=selected_trader, transactions=trader_transactions, rates=current_rates, drivers=drivers)
+    return render_template('trader_ledger.html', trader=selected_trader, transactions=trader_transactions, rates=current_rates, drivers=drivers, today_str=today_str, change_seq=change_seq)
 
 
 # --- TRANSACTION ROUTES ---
@@ -87,12 +185,16 @@ def add_bill(trader_id):
     amount_paid = float(request.form.get('amount_paid') or 0)
     remaining_due = total_bill - amount_paid
     
-    db.execute('UPDATE traders SET total_debt = total_debt + ? WHERE id = ?', (remaining_due, trader_id))
-    db.execute(
-        'INSERT INTO transactions (trader_id, type, date, details, driver_name, total_amount, amount_paid) VALUES (?, ?, ?, ?, ?, ?, ?)',
-        (trader_id, 'Purchase', today_str, "\n".join(bill_details), driver_name, total_bill, amount_paid)
-    )
-    db.commit()
+    with write_transaction(db):
+        # The trader may have been deleted on another counter while this page was open
+        if db.execute('UPDATE traders SET total_debt = total_debt + ? WHERE id = ?', (remaining_due, trader_id)).rowcount == 0:
+            flash("Trader not found.", 'error')
+            return redirect(url_for('home'))
+        cursor = db.execute(
+            'INSERT INTO transactions (trader_id, type, date, details, driver_name, total_amount, amount_paid) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (trader_id, 'Purchase', today_str, "\n".join(bill_details), driver_name, total_bill, amount_paid)
+        )
+        record_ledger_change(db, trader_id, cursor.lastrowid)
     
     flash(f"New bill totaling ₹{total_bill:.2f} added successfully!", 'success')
     return redirect(url_for('view_trader', trader_id=trader_id))
@@ -104,9 +206,12 @@ def add_payment(trader_id):
     amount_paid = float(request.form.get('amount_paid') or 0)
     
     if amount_paid > 0:
-        db.execute('UPDATE traders SET total_debt = total_debt - ? WHERE id = ?', (amount_paid, trader_id))
-        db.execute('INSERT INTO transactions (trader_id, type, date, details, total_amount, amount_paid) VALUES (?, ?, ?, ?, ?, ?)',(trader_id, 'Payment', date.today().isoformat(), 'Standalone Payment', 0, amount_paid))
-        db.commit()
+        with write_transaction(db):
+            if db.execute('UPDATE traders SET total_debt = total_debt - ? WHERE id = ?', (amount_paid, trader_id)).rowcount == 0:
+                flash("Trader not found.", 'error')
+                return redirect(url_for('home'))
+            cursor = db.execute('INSERT INTO transactions (trader_id, type, date, details, total_amount, amount_paid) VALUES (?, ?, ?, ?, ?, ?)',(trader_id, 'Payment', date.today().isoformat(), 'Standalone Payment', 0, amount_paid))
+            record_ledger_change(db, trader_id, cursor.lastrowid)
         flash(f"Payment of ₹{amount_paid:.2f} recorded successfully!", 'success')
     else:
         flash("Payment amount must be greater than zero.", 'error')
@@ -119,19 +224,9 @@ def add_payment(trader_id):
 def edit_bill(transaction_id):
     """Displays a form to edit a bill and processes the update."""
     db = get_db()
-    bill = db.execute('SELECT * FROM transactions WHERE id = ? AND type = "Purchase"', (transaction_id,)).fetchone()
-    if not bill:
-        flash("Bill not found.", "error")
-        return redirect(url_for('home'))
-
-    trader = db.execute('SELECT * FROM traders WHERE id = ?', (bill['trader_id'],)).fetchone()
 
     if request.method == 'POST':
-        # 1. Reverse the old transaction from the total debt
-        old_remaining_due = bill['total_amount'] - bill['amount_paid']
-        db.execute('UPDATE traders SET total_debt = total_debt - ? WHERE id = ?', (old_remaining_due, bill['trader_id']))
-        
-        # 2. Calculate the new transaction details from the form
+        # 1. Calculate the new transaction details from the form
         quantities = {'Minar': float(request.form.get('minar_qty') or 0), 'Broiler': float(request.form.get('broiler_qty') or 0), 'Parent': float(request.form.get('parent_qty') or 0)}
         rates_from_form = {'Minar': float(request.form.get('minar_rate') or 0), 'Broiler': float(request.form.get('broiler_rate') or 0), 'Parent': float(request.form.get('parent_rate') or 0)}
         new_driver = request.form.get('driver_name')
@@ -143,20 +238,38 @@ def edit_bill(transaction_id):
                 rate = rates_from_form.get(bird, 0)
                 new_total_bill += qty * rate
                 new_details.append(f"{bird}: {qty} {'units' if bird == 'Minar' else 'kg'} @ {'%.2f' % rate}")
-        
-        # 3. Apply the new transaction to the total debt
         new_remaining_due = new_total_bill - new_amount_paid
-        db.execute('UPDATE traders SET total_debt = total_debt + ? WHERE id = ?', (new_remaining_due, bill['trader_id']))
-        
-        # 4. Update the transaction in the database
-        db.execute(
-            'UPDATE transactions SET details = ?, driver_name = ?, total_amount = ?, amount_paid = ? WHERE id = ?',
-            ("\n".join(new_details), new_driver, new_total_bill, new_amount_paid, transaction_id)
-        )
-        db.commit()
+
+        with write_transaction(db):
+            # 2. Re-read the bill under the write lock and make sure nobody else
+            #    changed it since the edit form was opened
+            bill = db.execute('SELECT * FROM transactions WHERE id = ? AND type = "Purchase"', (transaction_id,)).fetchone()
+            if not bill:
+                flash("Bill not found.", "error")
+                return redirect(url_for('home'))
+            if bill['version'] != request.form.get('version', type=int):
+                flash(f"Bill #{transaction_id} was changed on another counter while you were editing it. Please check it and save again.", "error")
+                return redirect(url_for('edit_bill', transaction_id=transaction_id))
+
+            # 3. Reverse the old transaction and apply the new one to the total debt
+            old_remaining_due = bill['total_amount'] - bill['amount_paid']
+            db.execute('UPDATE traders SET total_debt = total_debt - ? + ? WHERE id = ?', (old_remaining_due, new_remaining_due, bill['trader_id']))
+
+            # 4. Update the transaction in the database
+            db.execute(
+                'UPDATE transactions SET details = ?, driver_name = ?, total_amount = ?, amount_paid = ?, version = version + 1 WHERE id = ?',
+                ("\n".join(new_details), new_driver, new_total_bill, new_amount_paid, transaction_id)
+            )
+            record_ledger_change(db, bill['trader_id'], transaction_id)
         flash(f"Bill #{transaction_id} was updated successfully!", "success")
         return redirect(url_for('view_trader', trader_id=bill['trader_id']))
 
+    bill = db.execute('SELECT * FROM transactions WHERE id = ? AND type = "Purchase"', (transaction_id,)).fetchone()
+    if not bill:
+        flash("Bill not found.", "error")
+        return redirect(url_for('home'))
+    trader = db.execute('SELECT * FROM traders WHERE id = ?', (bill['trader_id'],)).fetchone()
+
     # For GET request, pre-populate the form by parsing the details string
     bill_items = {}
     if bill['details']:
@@ -173,16 +286,18 @@ def edit_bill(transaction_id):
 def delete_bill(transaction_id):
     """Deletes a bill and reverses its financial impact."""
     db = get_db()
-    bill = db.execute('SELECT * FROM transactions WHERE id = ? AND type = "Purchase"', (transaction_id,)).fetchone()
-    
+    with write_transaction(db):
+        bill = db.execute('SELECT * FROM transactions WHERE id = ? AND type = "Purchase"', (transaction_id,)).fetchone()
+        if bill:
+            # Reverse the financial impact of the bill
+            remaining_due = bill['total_amount'] - bill['amount_paid']
+            db.execute('UPDATE traders SET total_debt = total_debt - ? WHERE id = ?', (remaining_due, bill['trader_id']))
+
+            # Delete the transaction record
+            db.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
+            record_ledger_change(db, bill['trader_id'], transaction_id, deleted=True)
+
     if bill:
-        # Reverse the financial impact of the bill
-        remaining_due = bill['total_amount'] - bill['amount_paid']
-        db.execute('UPDATE traders SET total_debt = total_debt - ? WHERE id = ?', (remaining_due, bill['trader_id']))
-        
-        # Delete the transaction record
-        db.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
-        db.commit()
         flash(f"Bill #{transaction_id} has been deleted successfully.", "success")
         return redirect(url_for('view_trader', trader_id=bill['trader_id']))
     else:
@@ -206,20 +321,20 @@ def add_trader():
 
     if name and line:
         db = get_db()
-        # Insert the new trader with the specified opening balance
-        cursor = db.execute('INSERT INTO traders (name, line, total_debt) VALUES (?, ?, ?)', (name, line, opening_balance))
-        
-        # If there was an opening balance, create an initial transaction for it.
-        # This ensures the ledger is accurate from the start.
-        if opening_balance > 0:
-            new_trader_id = cursor.lastrowid
-            today_str = date.today().isoformat()
-            db.execute(
-                'INSERT INTO transactions (trader_id, type, date, details, total_amount, amount_paid) VALUES (?, ?, ?, ?, ?, ?)',
-                (new_trader_id, 'Purchase', today_str, 'Opening Balance', opening_balance, 0)
-            )
-            
-        db.commit()
+        with write_transaction(db):
+            # Insert the new trader with the specified opening balance
+            cursor = db.execute('INSERT INTO traders (name, line, total_debt) VALUES (?, ?, ?)', (name, line, opening_balance))
+
+            # If there was an opening balance, create an initial transaction for it.
+            # This ensures the ledger is accurate from the start.
+            if opening_balance > 0:
+                new_trader_id = cursor.lastrowid
+                today_str = date.today().isoformat()
+                db.execute(
+                    'INSERT INTO transactions (trader_id, type, date, details, total_amount, amount_paid) VALUES (?, ?, ?, ?, ?, ?)',
+                    (new_trader_id, 'Purchase', today_str, 'Opening Balance', opening_balance, 0)
+                )
+            record_trader_change(db, cursor.lastrowid)
         flash(f"Trader '{name}' was added successfully with an opening balance of ₹{opening_balance:.2f}.", 'success')
     return redirect(url_for('manage_traders'))
 
@@ -230,8 +345,18 @@ def edit_trader(trader_id):
         name = request.form['name']
         line = request.form['line']
         if name and line:
-            db.execute('UPDATE traders SET name = ?, line = ? WHERE id = ?', (name, line, trader_id))
-            db.commit()
+            with write_transaction(db):
+                # Only apply the edit if the name and line are unchanged since the form was opened;
+                # balance updates leave the version alone, so bills and payments never block it
+                cursor = db.execute(
+                    'UPDATE traders SET name = ?, line = ?, version = version + 1 WHERE id = ? AND version = ?',
+                    (name, line, trader_id, request.form.get('version', type=int))
+                )
+                if cursor.rowcount:
+                    record_trader_change(db, trader_id)
+            if cursor.rowcount == 0:
+                flash("This trader was changed on another counter while you were editing. Please check the details and save again.", 'error')
+                return redirect(url_for('edit_trader', trader_id=trader_id))
             flash(f"Trader '{name}' updated successfully!", 'success')
             return redirect(url_for('manage_traders'))
     trader = db.execute('SELECT * FROM traders WHERE id = ?', (trader_id,)).fetchone()
@@ -243,11 +368,13 @@ def edit_trader(trader_id):
 @app.route('/delete_trader/<int:trader_id>', methods=['POST'])
 def delete_trader(trader_id):
     db = get_db()
-    trader = db.execute('SELECT name FROM traders WHERE id = ?', (trader_id,)).fetchone()
+    with write_transaction(db):
+        trader = db.execute('SELECT name FROM traders WHERE id = ?', (trader_id,)).fetchone()
+        if trader:
+            db.execute('DELETE FROM traders WHERE id = ?', (trader_id,))
+            db.execute('DELETE FROM transactions WHERE trader_id = ?', (trader_id,))
+            record_change(db, 'trader_deleted', trader_id=trader_id)
     if trader:
-        db.execute('DELETE FROM traders WHERE id = ?', (trader_id,))
-        db.execute('DELETE FROM transactions WHERE trader_id = ?', (trader_id,))
-        db.commit()
         flash(f"Trader '{trader['name']}' and all their transactions have been deleted.", 'success')
     return redirect(url_for('manage_traders'))
 
@@ -256,22 +383,67 @@ def manage_rates():
     db = get_db()
     today_str = date.today().isoformat()
     if request.method == 'POST':
-        for line in lines:
-            for bird in bird_types:
-                rate_value = request.form.get(f'rate-{line}-{bird}')
-                if rate_value:
-                    existing = db.execute('SELECT id FROM daily_rates WHERE date = ? AND line = ? AND bird_type = ?', (today_str, line, bird)).fetchone()
-                    if existing:
-                        db.execute('UPDATE daily_rates SET rate = ? WHERE id = ?', (float(rate_value), existing['id']))
-                    else:
-                        db.execute('INSERT INTO daily_rates (date, line, bird_type, rate) VALUES (?, ?, ?, ?)', (today_str, line, bird, float(rate_value)))
-        db.commit()
+        saved_rates = {}
+        with write_transaction(db):
+            for line in lines:
+                for bird in bird_types:
+                    rate_value = request.form.get(f'rate-{line}-{bird}')
+                    if rate_value:
+                        saved_rates.setdefault(line, {})[bird] = float(rate_value)
+                        existing = db.execute('SELECT id FROM daily_rates WHERE date = ? AND line = ? AND bird_type = ?', (today_str, line, bird)).fetchone()
+                        if existing:
+                            db.execute('UPDATE daily_rates SET rate = ? WHERE id = ?', (float(rate_value), existing['id']))
+                        else:
+                            db.execute('INSERT INTO daily_rates (date, line, bird_type, rate) VALUES (?, ?, ?, ?)', (today_str, line, bird, float(rate_value)))
+            if saved_rates:
+                record_change(db, 'rates', date=today_str, rates=saved_rates)
         flash("Today's rates have been saved successfully!", 'success')
         return redirect(url_for('manage_rates'))
+    # Read the feed position before the rates, so a change saved in between is replayed rather than lost
+    change_seq = latest_change_seq(db)
     rates_from_db = db.execute('SELECT line, bird_type, rate FROM daily_rates WHERE date = ?', (today_str,)).fetchall()
     current_rates = {line: {} for line in lines}
     for rate in rates_from_db: current_rates[rate['line']][rate['bird_type']] = rate['rate']
-    return render_template('manage_rates.html', lines=lines, bird_types=bird_types, current_rates=current_rates, today_str=today_str)
+    return render_template('manage_rates.html', lines=lines, bird_types=bird_types, current_rates=current_rates, today_str=today_str, change_seq=change_seq)
+
+@app.route('/changes')
+def change_feed():
+    """Streams ledger changes to open pages as server-sent events."""
+    db = get_db()
+    # A reconnecting browser sends the last id it saw; a fresh page passes the
+    # sequence number it was rendered at.
+    since = request.headers.get('Last-Event-ID', type=int)
+    if since is None:
+        since = request.args.get('since', latest_change_seq(db), type=int)
+    oldest = db.execute('SELECT MIN(seq) FROM changes').fetchone()[0]
+    # Deltas older than the retention window are gone, so the page has to reload.
+    needs_resync = oldest is not None and since < oldest - 1
+
+    def stream(seq):
+        # The request's own connection is closed once the response starts, so the
+        # stream keeps a connection of its own for as long as the page is open.
+        feed_db = sqlite3.connect(DATABASE, timeout=BUSY_TIMEOUT)
+        feed_db.row_factory = sqlite3.Row
+        try:
+            if needs_resync:
+                yield 'event: resync\ndata: {}\n\n'
+                seq = latest_change_seq(feed_db)
+            idle = 0
+            while True:
+                changes = feed_db.execute('SELECT seq, kind, payload FROM changes WHERE seq > ? ORDER BY seq', (seq,)).fetchall()
+                for change in changes:
+                    seq = change['seq']
+                    yield f"id: {seq}\nevent: {change['kind']}\ndata: {change['payload']}\n\n"
+                idle = 0 if changes else idle + CHANGE_POLL_INTERVAL
+                if idle >= CHANGE_KEEPALIVE_INTERVAL:
+                    # A comment line keeps proxies from closing a quiet connection.
+                    yield ': keep-alive\n\n'
+                    idle = 0
+                time.sleep(CHANGE_POLL_INTERVAL)
+        finally:
+            feed_db.close()
+
+    return Response(stream(since), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
 
 # --- REPORTS & PRINTING ROUTES ---
 @app.route('/reports')
@@ -286,12 +458,49 @@ def reports():
 @app.route('/bill/<int:transaction_id>/print')
 def print_bill(transaction_id):
     db = get_db()
-    bill = db.execute('SELECT * FROM transactions WHERE id = ? AND type = "Purchase"', (transaction_id,)).fetchone()
+    # The trader's name and line come from the same joined query as the bill
+    bill = db.execute(
+        """SELECT tx.*, t.name AS trader_name, t.line AS trader_line
+           FROM transactions tx JOIN traders t ON tx.trader_id = t.id
+           WHERE tx.id = ? AND tx.type = 'Purchase'""",
+        (transaction_id,)
+    ).fetchone()
     if not bill:
         flash("Bill not found.", 'error')
         return redirect(url_for('home'))
-    trader = db.execute('SELECT * FROM traders WHERE id = ?', (bill['trader_id'],)).fetchone()
-    return render_template('print_bill.html', bill=bill, trader=trader)
+    return render_template('print_bill.html', bills=[bill])
+
+@app.route('/line/<line_name>/bills')
+def print_line_bills(line_name):
+    """Prints all of today's bills for a line as one document."""
+    db = get_db()
+    bills = db.execute(
+        """SELECT tx.*, t.name AS trader_name, t.line AS trader_line
+           FROM transactions tx JOIN traders t ON tx.trader_id = t.id
+           WHERE tx.type = 'Purchase' AND tx.date = ? AND t.line = ? AND tx.details != 'Opening Balance'
+           ORDER BY t.name, tx.id""",
+        (date.today().isoformat(), line_name)
+    ).fetchall()
+    if not bills:
+        flash(f"No bills recorded today for {line_name}.", 'info')
+        return redirect(url_for('view_line', line_name=line_name))
+    return render_template('print_bill.html', bills=bills)
+
+@app.route('/driver/<driver_name>/bills')
+def print_driver_bills(driver_name):
+    """Prints all of today's bills carried by a driver as one document."""
+    db = get_db()
+    bills = db.execute(
+        """SELECT tx.*, t.name AS trader_name, t.line AS trader_line
+           FROM transactions tx JOIN traders t ON tx.trader_id = t.id
+           WHERE tx.type = 'Purchase' AND tx.date = ? AND tx.driver_name = ? AND tx.details != 'Opening Balance'
+           ORDER BY t.name, tx.id""",
+        (date.today().isoformat(), driver_name)
+    ).fetchall()
+    if not bills:
+        flash(f"No bills recorded today for driver {driver_name}.", 'info')
+        return redirect(url_for('home'))
+    return render_template('print_bill.html', bills=bills)
 
 @app.route('/trader/<int:trader_id>/statement')
 def print_statement(trader_id):
@@ -301,7 +510,35 @@ def print_statement(trader_id):
         flash("Trader not found.", 'error')
         return redirect(url_for('home'))
     transactions = db.execute('SELECT * FROM transactions WHERE trader_id = ? ORDER BY date, id', (trader_id,)).fetchall()
-    return render_template('print_statement.html', trader=trader, transactions=transactions, today_date=date.today().strftime('%d-%b-%Y'))
+    statements = [{'trader': trader, 'transactions': transactions}]
+    return render_template('print_statement.html', statements=statements, today_date=date.today().strftime('%d-%b-%Y'))
+
+@app.route('/line/<line_name>/statements')
+def print_line_statements(line_name):
+    """Prints the statement of every trader on a line as one document."""
+    db = get_db()
+    # A single ordered query for the whole line; rows arrive grouped by trader,
+    # so the statements can be built in one pass. Traders without any
+    # transactions still get a statement thanks to the LEFT JOIN.
+    rows = db.execute(
+        """SELECT t.id AS trader_id, t.name, t.line, t.total_debt,
+                  tx.id, tx.type, tx.date, tx.details, tx.driver_name, tx.total_amount, tx.amount_paid
+           FROM traders t LEFT JOIN transactions tx ON tx.trader_id = t.id
+           WHERE t.line = ?
+           ORDER BY t.name, t.id, tx.date, tx.id""",
+        (line_name,)
+    )
+    statements = []
+    for row in rows:
+        if not statements or statements[-1]['trader']['id'] != row['trader_id']:
+            trader = {'id': row['trader_id'], 'name': row['name'], 'line': row['line'], 'total_debt': row['total_debt']}
+            statements.append({'trader': trader, 'transactions': []})
+        if row['id'] is not None:
+            statements[-1]['transactions'].append(row)
+    if not statements:
+        flash(f"No traders found in {line_name}.", 'info')
+        return redirect(url_for('view_line', line_name=line_name))
+    return render_template('print_statement.html', statements=statements, line_name=line_name, today_date=date.today().strftime('%d-%b-%Y'))
 
 
 # And REPLACE it with this new section:
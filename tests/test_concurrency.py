@@ -0,0 +1,172 @@
+"""Hammers the ledger's mutation routes from many threads and checks that no update is lost,
+then checks that the change feed reports those updates to other counters."""
+import json
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import app as ledger
+
+THREADS = 16
+OPERATIONS_PER_THREAD = 30
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Points the app at a fresh database built by database_setup.py."""
+    subprocess.run([sys.executable, str(ROOT / 'database_setup.py')], cwd=tmp_path, check=True, capture_output=True)
+    path = str(tmp_path / 'poultry.db')
+    monkeypatch.setattr(ledger, 'DATABASE', path)
+    monkeypatch.setattr(ledger, '_schema_checked', False)
+    ledger.app.config['TESTING'] = True
+    return path
+
+
+def connect(path):
+    db = sqlite3.connect(path, timeout=ledger.BUSY_TIMEOUT)
+    db.row_factory = sqlite3.Row
+    return db
+
+
+def random_bill(rng, **extra):
+    form = {'broiler_qty': str(rng.randint(1, 9)), 'broiler_rate': str(rng.randint(50, 120)), 'driver_name': 'Deepu', 'amount_paid': str(rng.randint(0, 50))}
+    form.update(extra)
+    return form
+
+
+def test_balances_stay_consistent_under_concurrent_writes(database):
+    db = connect(database)
+    opening = {row['id']: row['total_debt'] for row in db.execute('SELECT id, total_debt FROM traders')}
+    db.close()
+    trader_ids = list(opening)
+    failures = []
+
+    def counter(seed):
+        rng = random.Random(seed)
+        client = ledger.app.test_client()
+        db = connect(database)
+        try:
+            for _ in range(OPERATIONS_PER_THREAD):
+                trader_id = rng.choice(trader_ids)
+                action = rng.random()
+                bill = db.execute(
+                    "SELECT id, version FROM transactions WHERE trader_id = ? AND type = 'Purchase' ORDER BY RANDOM() LIMIT 1",
+                    (trader_id,)
+                ).fetchone()
+                if action < 0.4 or bill is None:
+                    response = client.post(f'/trader/{trader_id}/add_bill', data=random_bill(rng))
+                elif action < 0.6:
+                    response = client.post(f'/trader/{trader_id}/add_payment', data={'amount_paid': str(rng.randint(1, 100))})
+                elif action < 0.85:
+                    # The version may already be stale; the edit must then be refused, not half-applied.
+                    response = client.post(f"/bill/{bill['id']}/edit", data=random_bill(rng, version=str(bill['version'])))
+                else:
+                    response = client.post(f"/bill/{bill['id']}/delete")
+                if response.status_code != 302:
+                    failures.append(response.status_code)
+        except Exception as error:
+            failures.append(error)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=counter, args=(seed,)) for seed in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert failures == []
+    db = connect(database)
+    for trader in db.execute('SELECT id, total_debt FROM traders'):
+        ledger_total = db.execute(
+            'SELECT COALESCE(SUM(total_amount - amount_paid), 0) FROM transactions WHERE trader_id = ?',
+            (trader['id'],)
+        ).fetchone()[0]
+        assert trader['total_debt'] == pytest.approx(opening[trader['id']] + ledger_total)
+    db.close()
+
+
+def test_payment_does_not_block_trader_edit(database):
+    client = ledger.app.test_client()
+    db = connect(database)
+    version = db.execute('SELECT version FROM traders WHERE id = 3').fetchone()['version']
+    client.post('/trader/3/add_payment', data={'amount_paid': '10'})
+    response = client.post('/edit_trader/3', data={'name': 'Suresh P.', 'line': 'Pati', 'version': str(version)})
+    assert response.location.endswith('/manage_traders')
+    assert db.execute('SELECT name FROM traders WHERE id = 3').fetchone()['name'] == 'Suresh P.'
+    db.close()
+
+
+def test_stale_or_malformed_bill_version_is_refused(database):
+    client = ledger.app.test_client()
+    client.post('/trader/1/add_bill', data={'broiler_qty': '2', 'broiler_rate': '100', 'driver_name': 'Deepu'})
+    client.post('/bill/1/edit', data={'broiler_qty': '3', 'broiler_rate': '100', 'driver_name': 'Deepu', 'version': '1'})
+    for version in ('1', 'abc', ''):
+        response = client.post('/bill/1/edit', data={'broiler_qty': '9', 'broiler_rate': '100', 'driver_name': 'Deepu', 'version': version})
+        assert response.location.endswith('/bill/1/edit')
+    db = connect(database)
+    assert db.execute('SELECT total_amount FROM transactions WHERE id = 1').fetchone()['total_amount'] == 300
+    db.close()
+
+
+def test_bill_or_payment_for_deleted_trader_is_refused(database):
+    client = ledger.app.test_client()
+    client.post('/delete_trader/2')
+    for url, form in (('/trader/2/add_bill', {'broiler_qty': '2', 'broiler_rate': '100', 'driver_name': 'Deepu'}), ('/trader/2/add_payment', {'amount_paid': '10'})):
+        response = client.post(url, data=form)
+        assert response.status_code == 302
+    db = connect(database)
+    assert db.execute('SELECT COUNT(*) FROM transactions WHERE trader_id = 2').fetchone()[0] == 0
+    db.close()
+
+
+def read_first_event(client, url, headers=None):
+    """Returns the first server-sent event of the change feed as a dict of its fields."""
+    response = client.get(url, headers=headers, buffered=False)
+    try:
+        chunk = next(iter(response.response))
+    finally:
+        response.close()
+    chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+    return dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+
+
+def test_change_feed_sends_changes_made_after_the_page_was_rendered(database):
+    client = ledger.app.test_client()
+    page = client.get('/trader/1').get_data(as_text=True)
+    since = int(re.search(r'let lastSeq = (\d+);', page).group(1))
+    client.post('/trader/1/add_bill', data={'broiler_qty': '2', 'broiler_rate': '100', 'driver_name': 'Deepu', 'amount_paid': '50'})
+
+    event = read_first_event(client, f'/changes?since={since}')
+    assert event['id'] == str(since + 1)
+    assert event['event'] == 'transaction'
+    change = json.loads(event['data'])
+    assert change['trader_id'] == 1
+    assert change['total_debt'] == pytest.approx(5400 + 200 - 50)
+    assert change['transaction']['total_amount'] == pytest.approx(200)
+
+
+def test_change_feed_prefers_last_event_id_over_since(database):
+    client = ledger.app.test_client()
+    for _ in range(2):
+        client.post('/trader/1/add_payment', data={'amount_paid': '10'})
+    event = read_first_event(client, '/changes?since=0', headers={'Last-Event-ID': '1'})
+    assert event['id'] == '2'
+
+
+def test_change_feed_asks_for_resync_once_changes_were_trimmed(database, monkeypatch):
+    monkeypatch.setattr(ledger, 'CHANGE_FEED_RETENTION', 2)
+    client = ledger.app.test_client()
+    for _ in range(4):
+        client.post('/trader/1/add_payment', data={'amount_paid': '10'})
+    # Only changes 3 and 4 are kept: a page at 2 can still catch up, a page at 1 cannot.
+    assert read_first_event(client, '/changes?since=2')['id'] == '3'
+    assert read_first_event(client, '/changes?since=1')['event'] == 'resync'